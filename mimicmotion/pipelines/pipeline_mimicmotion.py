@@ -366,6 +366,44 @@ class MimicMotionPipeline(DiffusionPipeline):
             extra_step_kwargs["generator"] = generator
         return extra_step_kwargs
 
+    def unet_graph_forward(self, return_dict=False, **unet_inputs):
+        """run the unet forward by replaying a cuda graph captured for the input shapes
+
+        The graph is captured on the first call for a given set of shapes and stored on `self._unet_graph`,
+        which only keeps the most recent graph so a single CUDA memory pool stays allocated.
+        Returns a tuple like `unet(..., return_dict=False)`, its tensor is a static output buffer that is
+        overwritten by the next replay.
+        """
+        key = tuple((name, tuple(value.shape), value.dtype) if torch.is_tensor(value) else (name, value)
+                    for name, value in unet_inputs.items())
+        unet_graphs = getattr(self, "_unet_graph", None)
+        if unet_graphs is None:
+            unet_graphs = self._unet_graph = {}
+
+        if key not in unet_graphs:
+            # free the previous graph and its memory pool before capturing a new one
+            unet_graphs.clear()
+            static_inputs = {name: value.clone() if torch.is_tensor(value) else value for name, value in unet_inputs.items()}
+            # warmup on a side stream before capture so lazy init and cudnn autotuning happen outside of it
+            stream = torch.cuda.Stream()
+            stream.wait_stream(torch.cuda.current_stream())
+            with torch.cuda.stream(stream):
+                for _ in range(3):
+                    self.unet(**static_inputs, return_dict=False)
+            torch.cuda.current_stream().wait_stream(stream)
+
+            graph = torch.cuda.CUDAGraph()
+            with torch.cuda.graph(graph):
+                static_output = self.unet(**static_inputs, return_dict=False)[0]
+            unet_graphs[key] = (graph, static_inputs, static_output)
+
+        graph, static_inputs, static_output = unet_graphs[key]
+        for name, value in unet_inputs.items():
+            if torch.is_tensor(value):
+                static_inputs[name].copy_(value)
+        graph.replay()
+        return (static_output,)
+
     @torch.no_grad()
     def __call__(
         self,
@@ -394,6 +432,7 @@ class MimicMotionPipeline(DiffusionPipeline):
         callback_on_step_end_tensor_inputs: List[str] = ["latents"],
         return_dict: bool = True,
         device: Union[str, torch.device] =None,
+        use_cuda_graph: bool = False,
     ):
         r"""
         The call function to the pipeline for generation.
@@ -458,6 +497,9 @@ class MimicMotionPipeline(DiffusionPipeline):
                 plain tuple.
             device:
                 On which device the pipeline runs on.
+            use_cuda_graph (`bool`, *optional*, defaults to `False`):
+                Capture the unet forward in a CUDA graph per input shape and replay it for every denoising step.
+                Ignored when the unet is compiled or the pipeline does not run on cuda.
 
         Returns:
             [`~pipelines.stable_diffusion.StableVideoDiffusionPipelineOutput`] or `tuple`:
@@ -587,6 +629,8 @@ class MimicMotionPipeline(DiffusionPipeline):
 
         # 8. Denoising loop
         self.unet.to(device)
+        use_cuda_graph = use_cuda_graph and torch.device(device).type == "cuda" and not is_compiled_module(self.unet)
+        unet_forward = self.unet_graph_forward if use_cuda_graph else self.unet
 
         self._num_timesteps = len(timesteps)
         pose_latents = einops.rearrange(pose_latents, '(b f) c h w -> b f c h w', f=num_frames)
@@ -611,9 +655,9 @@ class MimicMotionPipeline(DiffusionPipeline):
                 weight = (torch.arange(tile_size, device=device) + 0.5) * 2. / tile_size
                 weight = torch.minimum(weight, 2 - weight)
                 for idx in indices:
-                    _noise_pred = self.unet(
-                        latent_model_input[:, idx],
-                        t,
+                    _noise_pred = unet_forward(
+                        sample=latent_model_input[:, idx],
+                        timestep=t,
                         encoder_hidden_states=image_embeddings,
                         added_time_ids=added_time_ids,
                         pose_latents=pose_latents[:, idx].flatten(0, 1),
@@ -648,7 +692,12 @@ class MimicMotionPipeline(DiffusionPipeline):
 
                     latents = callback_outputs.pop("latents", latents)
 
-        self.unet.to(offload_device)
+        # a compiled unet is kept in place so its cuda graphs stay valid across calls
+        if not getattr(self, "keep_unet_on_device", False):
+            self.unet.to(offload_device)
+            if torch.device(offload_device) != torch.device(device):
+                # captured graphs point at the unet weights on the device, drop them once the unet has moved
+                self._unet_graph = {}
 
         if not output_type == "latent":
             # cast back to fp16 if needed
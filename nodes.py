@@ -1,58 +1,100 @@
 import os
+import importlib.util
 import torch
 import numpy as np
 import gc
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import folder_paths
 import comfy.model_management as mm
 import comfy.utils
 
+from safetensors import safe_open
+from safetensors.torch import save_file
+from accelerate import init_empty_weights
 from diffusers.models import AutoencoderKLTemporalDecoder
 from diffusers.schedulers import EulerDiscreteScheduler
 from transformers import CLIPImageProcessor, CLIPVisionModelWithProjection
 
 script_directory = os.path.dirname(os.path.abspath(__file__))
 
-from .mimicmotion.pipelines.pipeline_mimicmotion import MimicMotionPipeline, tensor2vid
+from .mimicmotion.pipelines.pipeline_mimicmotion import MimicMotionPipeline
 from .mimicmotion.modules.unet import UNetSpatioTemporalConditionModel
 from .mimicmotion.modules.pose_net import PoseNet
 
 from .lcm_scheduler import AnimateLCMSVDStochasticIterativeScheduler
 
-def loglinear_interp(t_steps, num_steps):
+def loglinear_interp(t_steps, num_steps, device="cpu"):
     """
     Performs log-linear interpolation of a given array of decreasing numbers.
     """
-    xs = np.linspace(0, 1, len(t_steps))
-    ys = np.log(t_steps[::-1])
-    
-    new_xs = np.linspace(0, 1, num_steps)
-    new_ys = np.interp(new_xs, xs, ys)
-    
-    interped_ys = np.exp(new_ys)[::-1].copy()
+    ys = torch.as_tensor(t_steps, dtype=torch.float64, device=device).flip(0).log()
+    xs = torch.linspace(0, 1, ys.numel(), dtype=torch.float64, device=device)
+
+    new_xs = torch.linspace(0, 1, num_steps, dtype=torch.float64, device=device)
+    idx = torch.searchsorted(xs, new_xs).clamp(1, ys.numel() - 1)
+    weights = (new_xs - xs[idx - 1]) / (xs[idx] - xs[idx - 1])
+    new_ys = torch.lerp(ys[idx - 1], ys[idx], weights)
+
+    interped_ys = new_ys.exp().flip(0)
     return interped_ys
 
+def hf_snapshot_download(**kwargs):
+    """
+    Downloads a huggingface hub snapshot, using hf_transfer when it is installed and the user hasn't configured it.
+    """
+    from huggingface_hub import snapshot_download, constants
+    if ("HF_HUB_ENABLE_HF_TRANSFER" in os.environ or not hasattr(constants, "HF_HUB_ENABLE_HF_TRANSFER")
+            or importlib.util.find_spec("hf_transfer") is None):
+        return snapshot_download(**kwargs)
+    # only flip the hub's global for this download, other nodes in the process keep their setting
+    hf_transfer_enabled = constants.HF_HUB_ENABLE_HF_TRANSFER
+    constants.HF_HUB_ENABLE_HF_TRANSFER = True
+    try:
+        return snapshot_download(**kwargs)
+    finally:
+        constants.HF_HUB_ENABLE_HF_TRANSFER = hf_transfer_enabled
+
+def cast_floating(tensor, dtype):
+    """
+    Casts floating point tensors to dtype and leaves integer tensors alone, like module.to(dtype).
+    """
+    return tensor.to(dtype) if tensor.is_floating_point() else tensor
+
+def images_to_device(images, device, dtype):
+    """
+    Moves a (B, H, W, C) image batch to the device as (B, C, H, W) in dtype, copying asynchronously from pinned memory when going from cpu to cuda.
+    """
+    images = images.permute(0, 3, 1, 2).contiguous()
+    if device.type == "cuda" and images.device.type == "cpu" and not images.is_pinned():
+        images = images.pin_memory()
+    return images.to(device, dtype=dtype, non_blocking=True)
+
 
 class MimicMotionModel(torch.nn.Module):
-    def __init__(self, base_model_path, lcm=False):
+    def __init__(self, base_model_path, lcm=False, dtype=torch.float16):
         """construnct base model components and load pretrained svd model except pose-net
         Args:
             base_model_path (str): pretrained svd model path
+            dtype (torch.dtype): dtype the pretrained components are loaded in
         """
         super().__init__()
         unet_subfolder = "unet_lcm" if lcm else "unet"
-        self.unet = UNetSpatioTemporalConditionModel.from_config(
-            UNetSpatioTemporalConditionModel.load_config(base_model_path, subfolder=unet_subfolder, variant="fp16"))
+        # unet and pose_net weights come from the MimicMotion checkpoint, so they are
+        # created on the meta device and materialized by load_state_dict(assign=True)
+        with init_empty_weights():
+            self.unet = UNetSpatioTemporalConditionModel.from_config(
+                UNetSpatioTemporalConditionModel.load_config(base_model_path, subfolder=unet_subfolder, variant="fp16"))
+            # pose_net
+            self.pose_net = PoseNet(noise_latent_channels=self.unet.config.block_out_channels[0])
         self.vae = AutoencoderKLTemporalDecoder.from_pretrained(
-            base_model_path, subfolder="vae", variant="fp16")
+            base_model_path, subfolder="vae", variant="fp16", torch_dtype=dtype, low_cpu_mem_usage=True)
         self.image_encoder = CLIPVisionModelWithProjection.from_pretrained(
-            base_model_path, subfolder="image_encoder", variant="fp16")
+            base_model_path, subfolder="image_encoder", variant="fp16", torch_dtype=dtype, low_cpu_mem_usage=True)
         self.noise_scheduler = EulerDiscreteScheduler.from_pretrained(
             base_model_path, subfolder="scheduler")
         self.feature_extractor = CLIPImageProcessor.from_pretrained(
             base_model_path, subfolder="feature_extractor")
-        # pose_net
-        self.pose_net = PoseNet(noise_latent_channels=self.unet.config.block_out_channels[0])
 
 class DownloadAndLoadMimicMotionModel:
     @classmethod
@@ -71,6 +113,16 @@ class DownloadAndLoadMimicMotionModel:
                         "default": 'fp16'
                     }),
             "lcm": ("BOOLEAN", {"default": False}),
+            "quantization": (
+                    [
+                        'none',
+                        'int8_wo',
+                        'int4_wo',
+                        'fp8_wo',
+                    ], {
+                        "default": 'none', "tooltip": "weight-only quantization of the unet, requires torchao (pip install torchao). int4_wo needs bf16 and keeps the unet on the device, fp8_wo needs an Ada or newer GPU"
+                    }),
+            "torch_compile": ("BOOLEAN", {"default": False, "tooltip": "compile the unet and pose_net with torch.compile, the first sampling run is slower. The compiled unet stays on the device between runs"}),
             
             },
         }
@@ -80,11 +132,18 @@ class DownloadAndLoadMimicMotionModel:
     FUNCTION = "loadmodel"
     CATEGORY = "MimicMotionWrapper"
 
-    def loadmodel(self, precision, model, lcm):
+    def loadmodel(self, precision, model, lcm, quantization='none', torch_compile=False):
         device = mm.get_torch_device()
         mm.soft_empty_cache()
         dtype = {"bf16": torch.bfloat16, "fp16": torch.float16, "fp32": torch.float32}[precision]
 
+        if quantization != 'none' and device.type != "cuda":
+            raise ValueError(f"{quantization} quantization requires a CUDA device")
+        if quantization == 'int4_wo' and dtype != torch.bfloat16:
+            raise ValueError("int4_wo quantization requires bf16 precision")
+        if quantization == 'fp8_wo' and torch.cuda.get_device_capability(device) < (8, 9):
+            raise ValueError("fp8_wo quantization requires a GPU with compute capability 8.9 (Ada) or newer")
+
         pbar = comfy.utils.ProgressBar(3)
         
         download_path = os.path.join(folder_paths.models_dir, "mimicmotion")
@@ -92,8 +151,7 @@ class DownloadAndLoadMimicMotionModel:
         
         if not os.path.exists(model_path):
             print(f"Downloading model to: {model_path}")
-            from huggingface_hub import snapshot_download
-            snapshot_download(repo_id="Kijai/MimicMotion_pruned", 
+            hf_snapshot_download(repo_id="Kijai/MimicMotion_pruned", 
                                 allow_patterns=[f"*{model}*"],
                                 local_dir=download_path, 
                                 local_dir_use_symlinks=False)
@@ -106,24 +164,65 @@ class DownloadAndLoadMimicMotionModel:
         
         if lcm and not os.path.exists(svd_lcm_path):
             print(f"Downloading AnimateLCM SVD model to: {model_path}")
-            from huggingface_hub import snapshot_download
-            snapshot_download(repo_id="Kijai/AnimateLCM-SVD-Comfy", 
+            hf_snapshot_download(repo_id="Kijai/AnimateLCM-SVD-Comfy", 
                                 allow_patterns=[f"*.json", "*diffusion_pytorch_model.fp16.safetensors*"],
                                 local_dir=svd_path, 
                                 local_dir_use_symlinks=False)
         else:
             if not os.path.exists(svd_path):
                 print(f"Downloading SVD model to: {model_path}")
-                from huggingface_hub import snapshot_download
-                snapshot_download(repo_id="vdo/stable-video-diffusion-img2vid-xt-1-1", 
+                hf_snapshot_download(repo_id="vdo/stable-video-diffusion-img2vid-xt-1-1", 
                                     allow_patterns=[f"*.json", "*fp16*"],
                                     local_dir=svd_path, 
                                     local_dir_use_symlinks=False)
         pbar.update(1)
 
-        mimicmotion_models = MimicMotionModel(svd_path, lcm=lcm).to(device=device).eval()
-        mimic_motion_sd = comfy.utils.load_torch_file(model_path)
-        mimicmotion_models.load_state_dict(mimic_motion_sd, strict=False)
+        mimicmotion_models = MimicMotionModel(svd_path, lcm=lcm, dtype=dtype)
+
+        # weights cast to a different precision are saved next to the model once and loaded as is afterwards
+        cast_model_path = os.path.join(download_path, f"{os.path.splitext(model)[0]}_{precision}.safetensors")
+        if os.path.exists(cast_model_path) and os.path.getmtime(cast_model_path) >= os.path.getmtime(model_path):
+            load_path = cast_model_path
+        else:
+            load_path = model_path
+
+        # cast each tensor as it is read so only one uncast tensor is alive at a time
+        needs_cast = False
+        if load_path.endswith(".safetensors"):
+            # load the weights straight onto the device and assign them instead of copying
+            mimic_motion_sd = {}
+            with safe_open(load_path, framework="pt", device=str(device)) as f:
+                for k in f.keys():
+                    tensor = f.get_tensor(k)
+                    needs_cast |= tensor.is_floating_point() and tensor.dtype != dtype
+                    mimic_motion_sd[k] = cast_floating(tensor, dtype)
+                    del tensor
+        else:
+            mimic_motion_sd = comfy.utils.load_torch_file(load_path, device=device)
+            for k in list(mimic_motion_sd.keys()):
+                needs_cast |= mimic_motion_sd[k].is_floating_point() and mimic_motion_sd[k].dtype != dtype
+                mimic_motion_sd[k] = cast_floating(mimic_motion_sd[k], dtype)
+
+        if needs_cast:
+            # only 16-bit casts are worth persisting, an fp32 copy would double the bytes read on every load
+            if dtype in (torch.float16, torch.bfloat16):
+                print(f"Saving {precision} weights to: {cast_model_path}")
+                # write to a temp file and move it into place so an interrupted save never leaves a truncated file
+                tmp_path = f"{cast_model_path}.tmp"
+                try:
+                    save_file(mimic_motion_sd, tmp_path)
+                    os.replace(tmp_path, cast_model_path)
+                except OSError as e:
+                    print(f"Could not save {precision} weights: {e}")
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+        mimicmotion_models.load_state_dict(mimic_motion_sd, strict=False, assign=True)
+        del mimic_motion_sd
+
+        missing_keys = [name for name, param in mimicmotion_models.named_parameters() if param.is_meta]
+        if missing_keys:
+            raise ValueError(f"Weights missing from {model_path}: {missing_keys[:5]}")
+        mimicmotion_models = mimicmotion_models.to(device=device).eval()
 
         if lcm:
             lcm_noise_scheduler = AnimateLCMSVDStochasticIterativeScheduler(
@@ -147,15 +246,30 @@ class DownloadAndLoadMimicMotionModel:
             feature_extractor = mimicmotion_models.feature_extractor, 
             pose_net = mimicmotion_models.pose_net,
         )
-        
-        pipeline.unet.to(dtype)
-        pipeline.pose_net.to(dtype)
-        pipeline.vae.to(dtype)
-        pipeline.image_encoder.to(dtype)
+
+        if quantization != 'none':
+            try:
+                from torchao.quantization import quantize_, Int8WeightOnlyConfig, Int4WeightOnlyConfig, Float8WeightOnlyConfig
+            except ImportError as e:
+                raise ImportError(f"{quantization} quantization requires torchao, install it with: pip install torchao") from e
+            quant_config = {
+                'int8_wo': Int8WeightOnlyConfig,
+                'int4_wo': Int4WeightOnlyConfig,
+                'fp8_wo': Float8WeightOnlyConfig,
+            }[quantization]()
+            quantize_(pipeline.unet, quant_config)
+
+        # reduce-overhead records cuda graphs against the unet weights, so the pipeline must not offload the
+        # compiled unet between runs or every sampler run would re-record them
+        # the int4 tensor-core layout can't be moved off the device at all
+        pipeline.keep_unet_on_device = torch_compile or quantization == 'int4_wo'
+        if torch_compile:
+            pipeline.unet = torch.compile(pipeline.unet, mode="reduce-overhead", dynamic=False)
+            pipeline.pose_net = torch.compile(pipeline.pose_net, mode="reduce-overhead", dynamic=False)
         
         mimic_model = {
             'pipeline': pipeline,
-            'dtype': dtype
+            'dtype': dtype,
         }
         pbar.update(1)
         return (mimic_model,)
@@ -239,6 +353,7 @@ class MimicMotionSampler:
             "context_size": ("INT", {"default": 16, "min": 1, "max": 128, "step": 1}),
             "context_overlap": ("INT", {"default": 6, "min": 1, "max": 128, "step": 1}),
             "keep_model_loaded": ("BOOLEAN", {"default": True}),            
+            "cuda_graph": ("BOOLEAN", {"default": False, "tooltip": "capture the unet forward in a CUDA graph and replay it each step, not used with a compiled unet"}),
             },
             "optional": {
                 "optional_scheduler": ("DIFFUSERS_SCHEDULER",),
@@ -251,11 +366,12 @@ class MimicMotionSampler:
     CATEGORY = "MimicMotionWrapper"
 
     def process(self, mimic_pipeline, ref_image, pose_images, cfg_min, cfg_max, steps, seed, noise_aug_strength, fps, keep_model_loaded, 
-                context_size, context_overlap, optional_scheduler=None):
+                context_size, context_overlap, cuda_graph=False, optional_scheduler=None):
         device = mm.get_torch_device()
         offload_device = mm.unet_offload_device()
         mm.unload_all_models()
-        mm.soft_empty_cache()
+        # the pose detector's onnxruntime sessions are invisible to comfy's model management, free them before sampling
+        MimicMotionGetPoses.release_detector()
         dtype = mimic_pipeline['dtype']
         pipeline = mimic_pipeline['pipeline']           
 
@@ -279,13 +395,10 @@ class MimicMotionSampler:
 
         assert B >= context_size, "The number of poses must be greater than the context size"
 
-        ref_image = ref_image.permute(0, 3, 1, 2)
-        pose_images = pose_images.permute(0, 3, 1, 2)
-
-        pose_images = pose_images * 2 - 1
-
-        ref_image = ref_image.to(device).to(dtype)
-        pose_images = pose_images.to(device).to(dtype)
+        # async copies from pinned memory, the pose images are normalized to [-1, 1] in place on the device
+        ref_image = images_to_device(ref_image, device, dtype)
+        pose_images = images_to_device(pose_images, device, dtype)
+        pose_images.mul_(2.0).sub_(1.0)
 
         generator = torch.Generator(device=device)
         generator.manual_seed(seed)
@@ -307,12 +420,18 @@ class MimicMotionSampler:
             decode_chunk_size=4, 
             output_type="latent", 
             device=device,
-            sigmas=sigmas
+            sigmas=sigmas,
+            use_cuda_graph=cuda_graph
         ).frames
 
         if not keep_model_loaded:
-            pipeline.unet.to(offload_device)
+            if getattr(pipeline, "keep_unet_on_device", False):
+                print("Compiled or int4_wo quantized unet is kept on the device")
+            else:
+                pipeline.unet.to(offload_device)
             pipeline.vae.to(offload_device)
+            # release the captured unet cuda graph and its memory pool
+            pipeline._unet_graph = {}
             mm.soft_empty_cache()
             gc.collect()
 
@@ -334,21 +453,31 @@ class MimicMotionDecode:
     CATEGORY = "MimicMotionWrapper"
 
     def process(self, mimic_pipeline, samples, decode_chunk_size):
-        mm.soft_empty_cache()
-    
         pipeline = mimic_pipeline['pipeline']
         num_frames = samples['samples'].shape[0]
-        try:
-            frames = pipeline.decode_latents(samples['samples'], num_frames, decode_chunk_size)
-        except:
-            frames = pipeline.decode_latents(samples['samples'], num_frames, 1)
-        frames = tensor2vid(frames, pipeline.image_processor, output_type="pt")
+        # on OOM halve the chunk size only as far as needed
+        chunk_size = decode_chunk_size
+        while True:
+            try:
+                frames = pipeline.decode_latents(samples['samples'], num_frames, chunk_size)
+                break
+            except torch.cuda.OutOfMemoryError:
+                if chunk_size == 1:
+                    raise
+                mm.soft_empty_cache()
+                chunk_size = max(chunk_size // 2, 1)
+                print(f"Out of memory while decoding, retrying with decode_chunk_size {chunk_size}")
+        # decode_latents already streams the chunks to the cpu in the vae dtype and returns (F, C, 1, H, W) float32,
+        # so drop the ref frame first and postprocess all frames in one call instead of per frame
+        frames = pipeline.image_processor.postprocess(frames[1:, :, 0], output_type="pt")
         
-        frames = frames.squeeze(1)[1:].permute(0, 2, 3, 1).cpu().float()
+        frames = frames.permute(0, 2, 3, 1)
 
         return frames,
 
 class MimicMotionGetPoses:
+    _detector_cache = {}
+
     @classmethod
     def INPUT_TYPES(s):
         return {"required": {
@@ -365,13 +494,12 @@ class MimicMotionGetPoses:
     FUNCTION = "process"
     CATEGORY = "MimicMotionWrapper"
 
-    def process(self, ref_image, pose_images, include_body, include_hand, include_face):
-        device = mm.get_torch_device()
-        from .mimicmotion.dwpose.util import draw_pose
+    @classmethod
+    def get_detector(cls, device):
+        """download the DWPose models if needed and return a cached DWposeDetector for the device
+        """
         from .mimicmotion.dwpose.dwpose_detector import DWposeDetector
 
-        assert ref_image.shape[1:3] == pose_images.shape[1:3], "ref_image and pose_images must have the same resolution"
-
         yolo_model = "yolox_l.onnx"
         dw_pose_model = "dw-ll_ucoco_384.onnx"
         model_base_path = os.path.join(script_directory, "models", "DWPose")
@@ -379,28 +507,49 @@ class MimicMotionGetPoses:
         model_det=os.path.join(model_base_path, yolo_model)
         model_pose=os.path.join(model_base_path, dw_pose_model)
 
+        key = (model_det, model_pose, str(device))
+        if key in cls._detector_cache:
+            return cls._detector_cache[key]
+        # only keep a single detector alive
+        cls.release_detector()
+
         if not os.path.exists(model_det):
             print(f"Downloading yolo model to: {model_base_path}")
-            from huggingface_hub import snapshot_download
-            snapshot_download(repo_id="yzd-v/DWPose", 
+            hf_snapshot_download(repo_id="yzd-v/DWPose", 
                                 allow_patterns=[f"*{yolo_model}*"],
                                 local_dir=model_base_path, 
                                 local_dir_use_symlinks=False)
             
         if not os.path.exists(model_pose):
             print(f"Downloading dwpose model to: {model_base_path}")
-            from huggingface_hub import snapshot_download
-            snapshot_download(repo_id="yzd-v/DWPose", 
+            hf_snapshot_download(repo_id="yzd-v/DWPose", 
                                 allow_patterns=[f"*{dw_pose_model}*"],
                                 local_dir=model_base_path, 
                                 local_dir_use_symlinks=False)
 
         dwprocessor = DWposeDetector(
-            model_det=os.path.join(model_base_path, "yolox_l.onnx"),
-            model_pose=os.path.join(model_base_path, "dw-ll_ucoco_384.onnx"),
+            model_det=model_det,
+            model_pose=model_pose,
             device=device)
+        cls._detector_cache[key] = dwprocessor
+        return dwprocessor
+
+    @classmethod
+    def release_detector(cls):
+        """drop the cached DWposeDetector so its onnxruntime sessions free their memory
+        """
+        cls._detector_cache.clear()
+
+    def process(self, ref_image, pose_images, include_body, include_hand, include_face):
+        device = mm.get_torch_device()
+        from .mimicmotion.dwpose.util import draw_pose
+
+        assert ref_image.shape[1:3] == pose_images.shape[1:3], "ref_image and pose_images must have the same resolution"
+
+        dwprocessor = self.get_detector(device)
         
-        ref_image = ref_image.squeeze(0).cpu().numpy() * 255
+        # DWPose works on uint8 images, convert in torch before moving to numpy
+        ref_image = ref_image.squeeze(0).mul(255).round_().clamp_(0, 255).to(torch.uint8).cpu().numpy()
 
         # select ref-keypoint from reference pose for pose rescale
         ref_pose = dwprocessor(ref_image)
@@ -410,7 +559,7 @@ class MimicMotionGetPoses:
         ref_body = ref_pose['bodies']['candidate'][ref_keypoint_id]
  
         height, width, _ = ref_image.shape
-        pose_images_np = pose_images.cpu().numpy() * 255
+        pose_images_np = pose_images.mul(255).round_().clamp_(0, 255).to(torch.uint8).cpu().numpy()
 
         # read input video
         pbar = comfy.utils.ProgressBar(len(pose_images_np))
@@ -419,35 +568,62 @@ class MimicMotionGetPoses:
             detected_poses_np_list.append(dwprocessor(img_np))
             pbar.update(1)
 
-        detected_bodies = np.stack(
-            [p['bodies']['candidate'] for p in detected_poses_np_list if p['bodies']['candidate'].shape[0] == 18])[:,
-                        ref_keypoint_id]
+        # gather the ref keypoints of single-person frames straight into a preallocated array
+        detected_bodies = np.empty((len(detected_poses_np_list), len(ref_keypoint_id), 2))
+        num_bodies = 0
+        for p in detected_poses_np_list:
+            candidate = p['bodies']['candidate']
+            if candidate.shape[0] == 18:
+                detected_bodies[num_bodies] = candidate[ref_keypoint_id]
+                num_bodies += 1
+        detected_bodies = detected_bodies[:num_bodies]
+        if num_bodies == 0 or len(ref_keypoint_id) == 0:
+            raise ValueError("no frame with a single detected person and visible reference keypoints, can't rescale the poses")
         # compute linear-rescale params
-        ay, by = np.polyfit(detected_bodies[:, :, 1].flatten(), np.tile(ref_body[:, 1], len(detected_bodies)), 1)
+        # closed-form least squares fit of ref_y = ay * y + by
+        x = detected_bodies[:, :, 1].flatten()
+        y = np.tile(ref_body[:, 1], len(detected_bodies))
+        x_mean, y_mean = x.mean(), y.mean()
+        x_var = ((x - x_mean) ** 2).sum()
+        if x_var == 0:
+            raise ValueError("detected keypoints have no vertical spread, can't rescale the poses")
+        ay = ((x - x_mean) * (y - y_mean)).sum() / x_var
+        by = y_mean - ay * x_mean
         fh, fw, _ = pose_images_np[0].shape
         ax = ay / (fh / fw / height * width)
         bx = np.mean(np.tile(ref_body[:, 0], len(detected_bodies)) - detected_bodies[:, :, 0].flatten() * ax)
         a = np.array([ax, ay])
         b = np.array([bx, by])
-        output_pose = []
-        # pose rescale 
-        for detected_pose in detected_poses_np_list:
-            if include_body:
-                detected_pose['bodies']['candidate'] = detected_pose['bodies']['candidate'] * a + b
-            if include_hand:
-                detected_pose['faces'] = detected_pose['faces'] * a + b
-            if include_face:
-                detected_pose['hands'] = detected_pose['hands'] * a + b
-            im = draw_pose(detected_pose, height, width, include_body=include_body, include_hand=include_hand, include_face=include_face)
-            output_pose.append(np.array(im))
-
-        output_pose_tensors = [torch.tensor(np.array(im)) for im in output_pose]
-        output_tensor = torch.stack(output_pose_tensors) / 255
-
-        ref_pose_img = draw_pose(ref_pose, height, width, include_body=include_body, include_hand=include_hand, include_face=include_face)
-        ref_pose_tensor = torch.tensor(np.array(ref_pose_img)) / 255
-        output_tensor = torch.cat((ref_pose_tensor.unsqueeze(0), output_tensor))
-        output_tensor = output_tensor.permute(0, 2, 3, 1).cpu().float()
+        # pose rescale, applied once over the keypoints of all frames
+        def rescale(keypoints):
+            split_ids = np.cumsum([len(k) for k in keypoints])[:-1]
+            return np.split(np.concatenate(keypoints) * a + b, split_ids)
+
+        if include_body:
+            candidates = rescale([p['bodies']['candidate'] for p in detected_poses_np_list])
+            for detected_pose, candidate in zip(detected_poses_np_list, candidates):
+                detected_pose['bodies']['candidate'] = candidate
+        if include_hand:
+            hands = rescale([p['hands'] for p in detected_poses_np_list])
+            for detected_pose, hand in zip(detected_poses_np_list, hands):
+                detected_pose['hands'] = hand
+        if include_face:
+            faces = rescale([p['faces'] for p in detected_poses_np_list])
+            for detected_pose, face in zip(detected_poses_np_list, faces):
+                detected_pose['faces'] = face
+
+        # draw the ref pose and all frame poses in parallel, cv2 drawing releases the GIL
+        pbar = comfy.utils.ProgressBar(len(detected_poses_np_list) + 1)
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            futures = [executor.submit(draw_pose, pose, height, width, include_body=include_body, include_hand=include_hand, include_face=include_face)
+                       for pose in [ref_pose] + detected_poses_np_list]
+            for _ in as_completed(futures):
+                pbar.update(1)
+            output_pose = [future.result() for future in futures]
+
+        # stack as uint8 (B, H, W, C) and convert to float once
+        output_np = np.ascontiguousarray(np.stack(output_pose).transpose(0, 2, 3, 1))
+        output_tensor = torch.from_numpy(output_np).to(torch.float32).div_(255.)
         
         return output_tensor, output_tensor[1:]
 